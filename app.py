@@ -1,14 +1,26 @@
 from flask import Flask, request, jsonify, render_template
 from flask_cors import CORS
 import google.generativeai as genai
-import re
+import asyncio
+import json
+import typing
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from paapi5_python_sdk.api.default_api import DefaultApi
+from paapi5_python_sdk.api_client import ApiClient
+from paapi5_python_sdk.configuration import Configuration
 from paapi5_python_sdk.models.partner_type import PartnerType
 from paapi5_python_sdk.models.search_items_request import SearchItemsRequest
 from paapi5_python_sdk.models.search_items_resource import SearchItemsResource
 from paapi5_python_sdk.rest import ApiException
+import datetime
+import functools
+import hashlib
 import logging
+import math
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -17,13 +29,203 @@ load_dotenv()
 app = Flask(__name__, template_folder='templates')
 CORS(app)
 
-# Setup logging
-logging.basicConfig(level=logging.DEBUG)
+# Setup logging; default to WARNING so the debug trail costs nothing in
+# production, while LOG_LEVEL=DEBUG restores the old behaviour locally.
+logging.basicConfig(level=getattr(logging, os.getenv('LOG_LEVEL', 'WARNING').upper(), logging.WARNING))
 
 # Gemini API configuration
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 genai.configure(api_key=GEMINI_API_KEY)
-model = genai.GenerativeModel('gemini-1.0-pro')
+
+# Flash is markedly faster and cheaper than Pro and fully sufficient for this
+# short, tightly templated generation task.
+GEMINI_MODEL_NAME = 'gemini-1.5-flash'
+
+# The static scaffolding shared by every prompt. Keeping it in the system
+# instruction lets Gemini's context caching reuse the tokenized prefix, so
+# each request only pays for the small dynamic tail.
+_SYSTEM_INSTRUCTION = (
+    "You are an expert in finding gifts for Indian people. Provide me a list of 6 popular and "
+    "trending different products that can be searched using the product name. These gifts should "
+    "be popular among Indian people and available on e-commerce websites like Amazon India. "
+    "Respond with a JSON array of exactly 6 objects. Each object has a 'keyword' field holding "
+    "the detailed product name including company, model and price, and a 'reason' field holding "
+    "a convincing explanation of why the product is a good gift for an Indian consumer. Here is "
+    "an example object:\n"
+    "{\"keyword\": \"RVA Cute Flower Shaped Floor Cushion for Kids Room Living Room, Bedroom "
+    "Furnishing Velvet Throw Pillow Cushion for Home Decoration Kids Girls Women Gift\", "
+    "\"reason\": \"Chosen for its cute design, suitable for kids and home decoration, and its "
+    "popularity on Indian e-commerce sites.\"}"
+)
+
+class GiftIdea(typing.TypedDict):
+    keyword: str
+    reason: str
+
+# Structured decoding: the model emits the schema directly and json.loads
+# replaces the regex clean-up and hand-rolled line parsing.
+_GIFT_IDEAS_CONFIG = genai.GenerationConfig(
+    response_mime_type='application/json',
+    response_schema=list[GiftIdea],
+)
+_BATCHED_IDEAS_CONFIG = genai.GenerationConfig(
+    response_mime_type='application/json',
+    response_schema=list[list[GiftIdea]],
+)
+
+model = genai.GenerativeModel(GEMINI_MODEL_NAME, system_instruction=_SYSTEM_INSTRUCTION)
+
+_PROMPT_CACHE_TTL = datetime.timedelta(hours=1)
+_PROMPT_CACHE_REFRESH_MARGIN = 300  # refresh this many seconds before the TTL lapses
+_PROMPT_CACHE_RETRY_INTERVAL = 300
+
+_cached_model = None
+_cached_model_refresh_at = 0.0   # next refresh attempt; 0.0 forces the first one
+_cached_model_hard_expiry = 0.0  # when the handle's server-side TTL lapses
+_cached_model_refreshing = False
+_cached_model_lock = threading.Lock()
+
+def _get_model():
+    """Return the model bound to the cached prompt scaffold, or the plain
+    model while no handle is available. The CachedContent create call runs in
+    a background thread, so a refresh (or a retry while caching is
+    unavailable) never stalls the request path; a handle past its refresh
+    point keeps serving until the replacement lands."""
+    global _cached_model_refreshing
+    with _cached_model_lock:
+        current = _cached_model
+        needs_refresh = time.monotonic() >= _cached_model_refresh_at \
+            and not _cached_model_refreshing
+        if needs_refresh:
+            _cached_model_refreshing = True
+    if needs_refresh:
+        threading.Thread(target=_refresh_cached_model, name='prompt-cache-refresh', daemon=True).start()
+    return current if current is not None else model
+
+def _refresh_cached_model():
+    global _cached_model, _cached_model_refresh_at, _cached_model_hard_expiry, _cached_model_refreshing
+    try:
+        cached = genai.caching.CachedContent.create(
+            model=GEMINI_MODEL_NAME,
+            system_instruction=_SYSTEM_INSTRUCTION,
+            ttl=_PROMPT_CACHE_TTL,
+        )
+        new_model = genai.GenerativeModel.from_cached_content(cached)
+    except Exception as e:
+        logging.warning('Gemini context caching unavailable, using uncached model: %s', e)
+        with _cached_model_lock:
+            # Keep a still-valid handle through a transient failure; only
+            # drop it once its server-side TTL has actually lapsed.
+            if time.monotonic() >= _cached_model_hard_expiry:
+                _cached_model = None
+            _cached_model_refresh_at = time.monotonic() + _PROMPT_CACHE_RETRY_INTERVAL
+            _cached_model_refreshing = False
+        return
+
+    now = time.monotonic()
+    with _cached_model_lock:
+        _cached_model = new_model
+        _cached_model_refresh_at = now + _PROMPT_CACHE_TTL.total_seconds() - _PROMPT_CACHE_REFRESH_MARGIN
+        _cached_model_hard_expiry = now + _PROMPT_CACHE_TTL.total_seconds()
+        _cached_model_refreshing = False
+
+def _generate_gift_text(prompt, on_text=None, generation_config=_GIFT_IDEAS_CONFIG):
+    model_obj = _get_model()
+    if on_text is None:
+        return model_obj.generate_content(prompt, generation_config=generation_config).text
+
+    # Stream the completion and surface the accumulated text after every
+    # chunk, so the caller can act on ideas before generation finishes.
+    received = []
+    for chunk in model_obj.generate_content(prompt, stream=True, generation_config=generation_config):
+        received.append(chunk.text)
+        on_text(''.join(received))
+    return ''.join(received)
+
+_BATCH_WINDOW = 0.025  # seconds to let near-simultaneous prompts pile up
+_BATCH_MAX = 8
+
+class _GeminiBatcher:
+    """Coalesces prompts that arrive within a short window into one
+    multi-prompt Gemini call and fans the split response back out to each
+    waiter. A batch of one degenerates to a plain direct call, so idle
+    traffic pays nothing beyond the debounce window."""
+
+    def __init__(self, window=_BATCH_WINDOW, max_batch=_BATCH_MAX):
+        self._window = window
+        self._max_batch = max_batch
+        self._pending = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        # Batches are dispatched on this pool so a multi-second generation
+        # only occupies one worker; the collector thread goes straight back
+        # to draining instead of head-of-line blocking every later batch.
+        self._pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix='gemini')
+        threading.Thread(target=self._run, name='gemini-batcher', daemon=True).start()
+
+    def submit(self, prompt, on_text=None):
+        future = Future()
+        with self._lock:
+            self._pending.append((prompt, on_text, future))
+        self._wakeup.set()
+        return future
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            time.sleep(self._window)
+            with self._lock:
+                batch = self._pending[:self._max_batch]
+                del self._pending[:self._max_batch]
+                if not self._pending:
+                    self._wakeup.clear()
+            if batch:
+                self._pool.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch):
+        if len(batch) == 1:
+            prompt, on_text, future = batch[0]
+            try:
+                future.set_result(_generate_gift_text(prompt, on_text))
+            except Exception as e:
+                future.set_exception(e)
+            return
+
+        prompts = [prompt for prompt, _, _ in batch]
+        combined = (
+            f"You will now handle {len(prompts)} independent gift requests. Respond with a JSON "
+            f"array containing one answer per request, in order; each answer is itself the JSON "
+            f"array of 6 gift ideas for its request.\n\n"
+            + '\n'.join(f"Request {i + 1}: {prompt}" for i, prompt in enumerate(prompts))
+        )
+        try:
+            response_text = _generate_gift_text(combined, generation_config=_BATCHED_IDEAS_CONFIG)
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        try:
+            answers = json.loads(response_text)
+        except ValueError:
+            answers = None
+        if not isinstance(answers, list) or len(answers) != len(batch):
+            # The model ignored the batching contract; answer each prompt
+            # alone, concurrently, so the last waiter is not stuck behind a
+            # serial re-run of the whole batch.
+            logging.warning('Batched Gemini response did not line up with %d prompts, retrying individually',
+                            len(batch))
+            for item in batch:
+                self._pool.submit(self._dispatch, [item])
+            return
+
+        for (_, on_text, future), answer in zip(batch, answers):
+            segment = json.dumps(answer)
+            if on_text is not None:
+                on_text(segment)
+            future.set_result(segment)
+
+_gemini_batcher = _GeminiBatcher()
 
 # Amazon API configuration
 access_key = os.getenv('AMAZON_ACCESS_KEY')
@@ -32,89 +234,265 @@ partner_tag = os.getenv('AMAZON_PARTNER_TAG')
 host = os.getenv('AMAZON_HOST')
 region = os.getenv('AMAZON_REGION')
 
-all_gift_ideas = []
+# Request invariants, computed once instead of per search.
+_PARTNER_TYPE = PartnerType.ASSOCIATES
+_PAAPI_RESOURCES = (
+    SearchItemsResource.ITEMINFO_TITLE,
+    SearchItemsResource.OFFERS_LISTINGS_PRICE,
+    SearchItemsResource.IMAGES_PRIMARY_LARGE,
+)
+
+# Shared PA-API client. Building it once at import time keeps the underlying
+# urllib3 pool's TCP+TLS connections to webservices.amazon.in warm across
+# requests, instead of paying a fresh handshake on every search.
+# Configuration's TypeWithDefault metaclass takes no constructor arguments,
+# so the pool size is set as an attribute.
+_paapi_configuration = Configuration()
+_paapi_configuration.connection_pool_maxsize = 20
+default_api = DefaultApi(api_client=ApiClient(
+    access_key=access_key,
+    secret_key=secret_key,
+    host=host,
+    region=region,
+    configuration=_paapi_configuration,
+))
+
+# Keywords already suggested, kept as an LRU so membership checks are O(1)
+# and memory stays bounded over the server's lifetime. Touched from both the
+# batcher thread and handler threads, so all access goes through the lock.
+_seen_keywords = OrderedDict()
+_seen_keywords_lock = threading.Lock()
+_SEEN_KEYWORDS_MAX = 2048
+
+# Response cache for /generate_gift_idea: an exact tier keyed on the
+# normalized form fields, plus a semantic tier that matches near-duplicate
+# free-form prompts by embedding similarity. A hit skips both the Gemini
+# generation and the Amazon searches.
+_EMBEDDING_MODEL = 'models/embedding-001'
+_RESPONSE_CACHE_TTL = 1800  # seconds; trending products go stale quickly
+_RESPONSE_CACHE_MAX = 512
+_SEMANTIC_SIMILARITY_THRESHOLD = 0.92
+
+_exact_response_cache = {}      # cache key -> (expires_at, search_results)
+_semantic_response_cache = []   # (expires_at, embedding, search_results)
+_response_cache_lock = threading.Lock()
+
+def _exact_cache_key(data):
+    fields = (
+        str(data.get('age', '')),
+        str(data.get('gender', '')),
+        str(data.get('occasion', '')),
+        str(data.get('recipient_type', '')),
+        ','.join(data.get('categories', []) or []),
+        str(data.get('price_range', '')),
+        (data.get('prompt', '') or '').strip().lower(),
+    )
+    return hashlib.blake2b('\x1f'.join(fields).encode('utf-8'), digest_size=16).hexdigest()
+
+def _embed_prompt(prompt):
+    try:
+        return genai.embed_content(model=_EMBEDDING_MODEL, content=prompt)['embedding']
+    except Exception as e:
+        logging.warning('Prompt embedding failed, skipping semantic cache: %s', e)
+        return None
+
+def _cosine_similarity(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+def _response_cache_get(cache_key, prompt_embedding=None):
+    now = time.monotonic()
+    with _response_cache_lock:
+        entry = _exact_response_cache.get(cache_key)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+        if prompt_embedding is not None:
+            for expires_at, embedding, results in _semantic_response_cache:
+                if expires_at > now and _cosine_similarity(prompt_embedding, embedding) >= _SEMANTIC_SIMILARITY_THRESHOLD:
+                    return results
+    return None
+
+def _response_cache_put(cache_key, prompt_embedding, results):
+    # Only replay genuinely useful responses: an empty idea list or rows from
+    # a throttled/failed Amazon phase would otherwise be served for the full
+    # TTL - and, via the semantic tier, to every merely similar prompt.
+    if not results or any('error' in result for result in results):
+        return
+
+    now = time.monotonic()
+    expires_at = now + _RESPONSE_CACHE_TTL
+    with _response_cache_lock:
+        _exact_response_cache[cache_key] = (expires_at, results)
+        if len(_exact_response_cache) > _RESPONSE_CACHE_MAX:
+            for key in [k for k, v in _exact_response_cache.items() if v[0] <= now]:
+                del _exact_response_cache[key]
+            while len(_exact_response_cache) > _RESPONSE_CACHE_MAX:
+                _exact_response_cache.pop(next(iter(_exact_response_cache)))
+        if prompt_embedding is not None:
+            _semantic_response_cache.append((expires_at, prompt_embedding, results))
+            if len(_semantic_response_cache) > _RESPONSE_CACHE_MAX:
+                _semantic_response_cache[:] = [e for e in _semantic_response_cache if e[0] > now][-_RESPONSE_CACHE_MAX:]
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
+_FORM_FIELDS = ('age', 'gender', 'occasion', 'recipient_type', 'categories', 'price_range')
+_MAX_PROMPT_LENGTH = 2048
+
+def _validate_request(data):
+    """Reason to reject the request outright, or None if it is worth the
+    Gemini call. Rejecting here costs microseconds; forwarding junk costs a
+    full paid generation."""
+    if not isinstance(data, dict):
+        return 'Request body must be a JSON object'
+    prompt = data.get('prompt') or ''
+    if not isinstance(prompt, str):
+        return 'Field "prompt" must be a string'
+    if len(prompt) > _MAX_PROMPT_LENGTH:
+        return f'Field "prompt" must be at most {_MAX_PROMPT_LENGTH} characters'
+    if not prompt.strip() and not any(data.get(field) for field in _FORM_FIELDS):
+        return 'Request must include a prompt or at least one recipient field'
+    return None
+
 @app.route('/generate_gift_idea', methods=['POST'])
-def generate_gift_idea():
+async def generate_gift_idea():
     try:
-        data = request.json
-        logging.debug(f'Received data: {data}')
-        
+        # silent=True turns unparseable JSON and wrong content types into
+        # None, so they hit the validation 400 instead of raising into the
+        # broad except below and becoming a 500.
+        data = request.get_json(silent=True)
+        logging.debug('Received data: %s', data)
+
+        validation_error = _validate_request(data)
+        if validation_error is not None:
+            return jsonify({"error": validation_error}), 400
+
+        cache_key = _exact_cache_key(data)
+        prompt_embedding = None
+        cached_results = _response_cache_get(cache_key)
+        if cached_results is None and data.get('prompt'):
+            prompt_embedding = await asyncio.to_thread(_embed_prompt, data['prompt'])
+            if prompt_embedding is not None:
+                cached_results = _response_cache_get(cache_key, prompt_embedding)
+        if cached_results is not None:
+            logging.debug('Returning cached search results')
+            return jsonify(cached_results)
+
         prompt_text = create_prompt_from_data(data)
-        logging.debug(f'Generated prompt: {prompt_text}')
-        
-        response = model.generate_content(prompt_text)
-        logging.debug(f'Gemini API response: {response.text}')
-        
-        cleaned_text = clean_text(response.text)
-        logging.debug(f'Cleaned text: {cleaned_text}')
-        
-        gift_ideas = process_and_structure_gift_ideas(cleaned_text)
-        logging.debug(f'Processed gift ideas: {gift_ideas}')
-        
-        unique_gift_ideas = filter_unique_gift_ideas(gift_ideas)
-        logging.debug(f'Unique gift ideas: {unique_gift_ideas}')
-        
-        all_gift_ideas.extend(unique_gift_ideas)
-        
-        # Perform search
-        search_results = perform_search(unique_gift_ideas)
-        logging.debug(f'Search results: {search_results}')
-        
+        logging.debug('Generated prompt: %s', prompt_text)
+
+        # Stream the generation and start each Amazon lookup the moment its
+        # idea is complete, instead of waiting for the full completion.
+        pipeline = _SearchPipeline()
+        parser = _IncrementalIdeaParser(pipeline.add)
+        response_text = await asyncio.wrap_future(
+            _gemini_batcher.submit(prompt_text, parser.feed))
+        logging.debug('Gemini API response: %s', response_text)
+        parser.close(response_text)
+
+        search_results = await asyncio.to_thread(pipeline.collect)
+
+        _response_cache_put(cache_key, prompt_embedding, search_results)
+
         return jsonify(search_results)
 
     except Exception as e:
-        logging.error(f'Error generating gift ideas: {e}')
+        logging.error('Error generating gift ideas: %s', e)
         return jsonify({"error": f"Error generating gift ideas: {e}"}), 500
 
-def perform_search(gift_ideas):
-    keywords = [item['keyword'] for item in gift_ideas]
-    results = []
-
-    default_api = DefaultApi(access_key=access_key, secret_key=secret_key, host=host, region=region)
-
-    for keyword in keywords:
-        search_items_request = SearchItemsRequest(
-            partner_tag=partner_tag,
-            partner_type=PartnerType.ASSOCIATES,
-            keywords=keyword.strip(),
-            search_index="All",
-            item_count=1,
-            resources=[
-                SearchItemsResource.ITEMINFO_TITLE,
-                SearchItemsResource.OFFERS_LISTINGS_PRICE,
-                SearchItemsResource.IMAGES_PRIMARY_LARGE,
-            ],
-        )
+_SEARCH_POOL = ThreadPoolExecutor(max_workers=16, thread_name_prefix='paapi')
 
-        try:
-            response = default_api.search_items(search_items_request)
-            logging.debug(f'Amazon API response for keyword "{keyword}": {response}')
-            
-            if response.search_result and response.search_result.items:
-                item = response.search_result.items[0]
-                result = {
-                    'name': keyword,
-                    'title': item.item_info.title.display_value,
-                    'image': item.images.primary.large.url,
-                    'price': item.offers.listings[0].price.display_amount,
-                    'url': item.detail_page_url,
-                    'reason': gift_ideas[keywords.index(keyword)]['reason']
-                }
-                results.append(result)
-            else:
-                results.append({'error': f'No items found for keyword: {keyword}'})
-
-        except ApiException as e:
-            logging.error(f'Amazon API exception: {e}')
-            results.append({'error': str(e)})
-
-    logging.debug(f'Search results: {results}')
-    return results
+class _SearchPipeline:
+    """Deduplicates ideas as they stream in and immediately schedules their
+    Amazon lookups on the shared pool, so PA-API latency hides under the tail
+    of the Gemini generation instead of being paid after it."""
+
+    def __init__(self):
+        self._futures = []
+
+    def add(self, idea):
+        if not filter_unique_gift_ideas([idea]):
+            return
+        self._futures.append(_SEARCH_POOL.submit(_search_one, len(self._futures), idea))
+
+    def collect(self):
+        results = [None] * len(self._futures)
+        for future in self._futures:
+            idx, result = future.result()
+            results[idx] = result
+        logging.debug('Search results: %s', results)
+        return results
+
+_PAAPI_CACHE_TTL = 3600  # seconds; bounds how stale a cached price can get
+
+def _search_one(idx, idea):
+    keyword = idea['keyword']
+    try:
+        product = _search_keyword(keyword.strip(), int(time.time() // _PAAPI_CACHE_TTL))
+    except ApiException as e:
+        logging.error('Amazon API exception: %s', e)
+        return idx, {'error': str(e)}
+
+    if product is None:
+        return idx, {'error': f'No items found for keyword: {keyword}'}
+    return idx, dict(product, reason=idea['reason'])
+
+@functools.lru_cache(maxsize=4096)
+def _search_keyword(keyword, _ttl_bucket):
+    """Product details for one keyword, minus the request-specific reason.
+
+    Popular keywords recur across users, so hits skip the PA-API round-trip
+    entirely (and its 1 req/sec throttle budget). _ttl_bucket quantizes the
+    wall clock into _PAAPI_CACHE_TTL buckets purely so entries expire; a
+    raised ApiException is never cached."""
+    search_items_request = SearchItemsRequest(
+        partner_tag=partner_tag,
+        partner_type=_PARTNER_TYPE,
+        keywords=keyword,
+        search_index="All",
+        # A few candidates per round-trip, so an unusable first item does not
+        # force a second paid lookup.
+        item_count=3,
+        resources=list(_PAAPI_RESOURCES),
+    )
+
+    response = default_api.search_items(search_items_request)
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        logging.debug('Amazon API response for keyword "%s": %s', keyword, response)
+
+    if response.search_result and response.search_result.items:
+        for item in response.search_result.items:
+            product = _item_to_result(item, keyword)
+            if product is not None:
+                return product
+    return None
+
+def _item_to_result(item, keyword):
+    """Result dict for one returned item, or None when it lacks a title or
+    URL. Items frequently come back without offers or images; those fields
+    degrade to None instead of raising and discarding the whole lookup."""
+    title = item.item_info.title.display_value if item.item_info and item.item_info.title else None
+    url = item.detail_page_url
+    if not title or not url:
+        return None
+
+    image = None
+    if item.images and item.images.primary and item.images.primary.large:
+        image = item.images.primary.large.url
+
+    price = None
+    if item.offers and item.offers.listings and item.offers.listings[0].price:
+        price = item.offers.listings[0].price.display_amount
+
+    return {
+        'name': keyword,
+        'title': title,
+        'image': image,
+        'price': price,
+        'url': url,
+    }
 
 def create_prompt_from_data(data):
     age = data.get('age', '')
@@ -130,10 +508,16 @@ def create_prompt_from_data(data):
     else:
         return create_prompt(age, gender, occasion, recipient_type, categories, price_range)
 
+# Frozen prompt fragments; everything invariant is built once at import time
+# (the full scaffolding lives in _SYSTEM_INSTRUCTION above), so per request
+# only the handful of small variable pieces are allocated and joined.
+_PROMPT_LEAD = "Generate the 6 gift ideas"
+_SEARCH_PROMPT_PREFIX = _PROMPT_LEAD + " based on the following input: '"
+
 def create_prompt(age, gender, occasion, recipient_type, categories, price_range):
-    prompt_parts = [
-        "You are an expert in finding gifts for Indian people. Provide me a list of 6 popular and trending different products that can be searched using the product name. Each product should include the detailed product name, company, model, and price."
-    ]
+    # Only the per-request fields; the shared scaffolding lives in the cached
+    # system instruction.
+    prompt_parts = [_PROMPT_LEAD]
 
     if age:
         prompt_parts.append(f"for a {age}-year-old")
@@ -148,90 +532,80 @@ def create_prompt(age, gender, occasion, recipient_type, categories, price_range
     if price_range:
         prompt_parts.append(f"within the price range {price_range}")
 
-    prompt_parts.append(
-        "These gifts should be popular among Indian people and available on e-commerce websites like Amazon India. Ensure that each product is followed by its detailed product name, company, model, price, and a convincing reason for its selection. Ensure that the products are listed without any special characters such as *, -, or numbering. Here is an example:"
-    )
-    prompt_parts.append(
-        "Product_name: RVA Cute Flower Shaped Floor Cushion for Kids Room Living Room, Bedroom Furnishing Velvet Throw Pillow Cushion for Home Decoration Kids Girls Women Gift "
-    )
-    prompt_parts.append(
-        "Reason: Chosen for its cute design, suitable for kids and home decoration, and its popularity on Indian e-commerce sites."
-    )
-    prompt_parts.append(
-        "Generate 6 products with detailed product name, company, model, price, and reason for selection as a gift idea. Each reason should be just below the product name."
-    )
-
-    return ' '.join(prompt_parts)
+    return ' '.join(prompt_parts) + '.'
 
 def create_search_prompt(textdata):
-    return (
-        f"You are an expert in finding gifts for Indian people. Based on the following input: '{textdata}', provide me with a list of 6 popular and trending products in India that would make excellent gifts for Indian people. "
-        f"These products should be available for purchase on major Indian e-commerce websites like Amazon India. Ensure that the list includes detailed product names, company, model, price, followed by a convincing reason for selecting each product as a gift idea. "
-        f"The reason should explain why the product is a good gift for Indian consumer. Provide the output in the following format:\n\n"
-        f"Product_name:\nReason:\n"
-        f"Product_name:\nReason:\n"
-        f"Product_name:\nReason:\n"
-        f"Product_name:\nReason:\n"
-        f"Product_name:\nReason:\n"
-        f"Product_name:\nReason:\n"
-        f"Here is an example:\n"
-        f"Product_name: RVA Cute Flower Shaped Floor Cushion for Kids Room Living Room, Bedroom Furnishing Velvet Throw Pillow Cushion for Home Decoration Kids Girls Women Gift \n"
-        f"Reason: Chosen for its cute design, suitable for kids and home decoration, and its popularity on Indian e-commerce sites."
-    )
+    return _SEARCH_PROMPT_PREFIX + textdata + "'."
 
 def filter_unique_gift_ideas(new_gift_ideas):
-    return [idea for idea in new_gift_ideas if idea not in all_gift_ideas]
-
-def clean_text(text):
-    # Removing unwanted characters
-    text = re.sub(r'[*-]', '', text)
-    text = re.sub(r'\d+\.\s*', '', text)
-    return text
-
-def process_and_structure_gift_ideas(text):
-    product_names = []
-    reasons = []
-
-    # Splitting text by new lines to separate product names and reasons
-    lines = text.split('\n')
-    product_line = None
-
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-
-        if "Reason:" in line:
-            reasons.append(line.replace("Reason:", "").strip())
-            if product_line is not None:
-                product_names.append(product_line)
-            product_line = None
-        else:
-            if product_line is None:
-                product_line = line
-            else:
-                product_line += " " + line
-
-    # Remove "Product_name: " prefix from product names
-    product_names = [remove_product_name_prefix(name) for name in product_names]
-
-    logging.debug(f'Extracted product names: {product_names}')
-    logging.debug(f'Extracted reasons: {reasons}')
-
-    combined_gift_ideas = []
-    for name, reason in zip(product_names, reasons):
-        combined_gift_ideas.append({
-            "keyword": name,
-            "reason": reason
-        })
-
-    logging.debug(f'Combined gift ideas: {combined_gift_ideas}')
-    return combined_gift_ideas
-
-def remove_product_name_prefix(name):
-    if name.startswith("Product_name:"):
-        return name[len("Product_name:"):].strip()
-    return name
+    unique = []
+    with _seen_keywords_lock:
+        for idea in new_gift_ideas:
+            keyword = idea['keyword']
+            if keyword in _seen_keywords:
+                _seen_keywords.move_to_end(keyword)
+                continue
+            _seen_keywords[keyword] = None
+            if len(_seen_keywords) > _SEEN_KEYWORDS_MAX:
+                _seen_keywords.popitem(last=False)
+            unique.append(idea)
+    return unique
+
+def _complete_json_objects(text):
+    """Slices of text covering each fully closed top-level object literal,
+    in order. Used to pull finished ideas out of a still-streaming array."""
+    objects = []
+    depth = 0
+    in_string = False
+    escaped = False
+    start = 0
+    for pos, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == '{':
+            if depth == 0:
+                start = pos
+            depth += 1
+        elif ch == '}' and depth:
+            depth -= 1
+            if depth == 0:
+                objects.append(text[start:pos + 1])
+    return objects
+
+class _IncrementalIdeaParser:
+    """Re-scans the accumulated JSON response on every feed and hands each
+    newly completed {keyword, reason} object to the callback exactly once,
+    without waiting for the array's closing bracket."""
+
+    def __init__(self, on_idea):
+        self._on_idea = on_idea
+        self._emitted = 0
+
+    def feed(self, text):
+        objects = _complete_json_objects(text)
+        for obj_text in objects[self._emitted:]:
+            try:
+                idea = json.loads(obj_text)
+            except ValueError:
+                logging.warning('Skipping malformed gift idea object: %s', obj_text)
+                continue
+            if idea.get('keyword') and idea.get('reason'):
+                self._on_idea({
+                    'keyword': str(idea['keyword']).strip(),
+                    'reason': str(idea['reason']).strip(),
+                })
+        self._emitted = max(self._emitted, len(objects))
+
+    close = feed
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # Local development only; production runs under gunicorn (see
+    # gunicorn.conf.py).
+    app.run(host='0.0.0.0', port=5000)
@@ -0,0 +1,11 @@
+import multiprocessing
+import os
+
+bind = '0.0.0.0:' + os.environ.get('PORT', '5000')
+workers = multiprocessing.cpu_count() * 2 + 1
+# The request path is dominated by outbound HTTP to Gemini and Amazon, so a
+# generous thread count per worker keeps many requests in flight at near-zero
+# CPU cost while they wait on the network.
+worker_class = 'gthread'
+threads = 16
+timeout = 30